@@ -6,77 +6,340 @@ organized by date, branches, and repositories.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import os
 from datetime import datetime, timedelta
 import base64
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, PageBreak, Table, TableStyle, XPreformatted
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.colors import black, blue, gray, lightgrey
 from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
 import argparse
-from collections import defaultdict
+import random
+from collections import defaultdict, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import groupby
+from operator import attrgetter, itemgetter
+import re
+import shelve
 import sys
+import threading
+import time
+from xml.sax.saxutils import escape
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Cap on concurrent branch requests, kept low enough to stay under Azure DevOps throttling
+BRANCH_LOOKUP_WORKERS = 20
+# Cap on repositories fetched at once
+REPO_FETCH_WORKERS = 16
+# Cap on HTTP requests in flight across all repositories and branches; also the connection pool size
+MAX_CONCURRENT_REQUESTS = 32
+
+# Branches a commit is listed under at most. A commit made on main before N branches were cut is
+# reachable from all N+1 of them, so the usual long-lived branches are preferred
+MAX_BRANCHES_PER_COMMIT = 2
+COMMON_BRANCHES = ('main', 'master', 'develop', 'dev', 'feature')
+COMMON_BRANCH_RANK = {name: rank for rank, name in enumerate(COMMON_BRANCHES)}
+
+# Azure DevOps repository URLs, in either format:
+#   https://dev.azure.com/{organization}/{project}/_git/{repository}
+#   https://{organization}.visualstudio.com/{project}/_git/{repository}
+# The project may be left out when the repository has the project's name, and host names
+# are case-insensitive
+REPO_URL_PATTERN = re.compile(
+    r'^https?://(?:[^@/]+@)?'
+    r'(?:dev\.azure\.com/(?P<org>[^/]+)|(?P<legacy_org>[^./]+)\.visualstudio\.com)'
+    r'/(?:DefaultCollection/)?(?:(?P<project>(?!_git/)[^/]+)/)?(?:_git/)?(?P<repo>[^/?#]+)',
+    re.IGNORECASE
+)
+
+# Attempts per request when Azure DevOps throttles (429) or fails with a transient server error
+MAX_REQUEST_ATTEMPTS = 6
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# (connect, read) timeout in seconds, so a hung endpoint can't stall the whole run
+DEFAULT_TIMEOUT = (5, 30)
+
+# Commits requested per page; listings are paged with $skip until a short page comes back
+COMMITS_PAGE_SIZE = 1000
+
+# On-disk cache of resolved branches, keyed by repository and commit ID
+BRANCH_CACHE_FILE = '.azdo_cache'
+# Seconds before an 'unknown' result is looked up again, so transient failures don't stick
+UNKNOWN_BRANCH_TTL = 24 * 60 * 60
+
+# Maximum commits per preformatted block, to bound the layout cost of any single flowable
+COMMIT_BLOCK_SIZE = 100
+# Report entries from which the styled report parses its commit blocks in worker processes;
+# below this, starting the workers costs more than it saves
+PARALLEL_MARKUP_MIN_COMMITS = 2000
+
+# Font, size, indent, color and space before for each kind of line in the plain-text report
+REPORT_LINE_STYLES = {
+    'title': ('Helvetica-Bold', 24, 0, black, 0),
+    'info': ('Helvetica', 10, 0, black, 0),
+    'summary': ('Helvetica-Bold', 10, 0, black, 0),
+    'date': ('Helvetica-Bold', 16, 0, blue, 12),
+    'repo': ('Helvetica-Bold', 14, 20, black, 8),
+    'branch': ('Helvetica-Bold', 12, 40, gray, 6),
+    'commit': ('Helvetica', 9, 60, black, 4),
+    'author': ('Helvetica', 9, 60, black, 0),
+    'commit_id': ('Helvetica', 9, 60, blue, 0),
+}
+
+# Markup for one commit in the Platypus report; every field must already be XML-escaped
+format_commit_markup = (
+    '<b>{time}</b>{message}\n'
+    '<i>Author:</i> {name} &lt;{email}&gt;\n'
+    '<i>Commit ID:</i> <font color="blue">{commit_id}</font>\n'
+).format_map
+
+# Slim record for a fetched commit, holding only what the report uses
+Commit = namedtuple('Commit', 'id date date_key author_name author_email message branches repository')
+
+def parse_api_date(value):
+    """Parse an Azure DevOps timestamp; fromisoformat only accepts a trailing 'Z' from Python 3.11"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+def truncate_message(message, limit=100):
+    """Flatten a commit message onto one line, cut to limit characters with a trailing ellipsis"""
+    message = message.strip()
+    if len(message) > limit:
+        return message[:limit].replace('\n', ' ') + "..."
+    return message.replace('\n', ' ')
+
+def commit_from_api(commit, repo_name):
+    """Build a Commit from an Azure DevOps commit object; branches are filled in later"""
+    author = commit['author']
+    # Parse the commit date once here; grouping and sorting reuse it
+    date = parse_api_date(author['date'])
+    
+    # The same few authors and days appear on most commits, so share one copy of their strings;
+    # the day is also the first part of every group key, which then compares by identity
+    return Commit(
+        id=commit['commitId'],
+        date=date,
+        date_key=sys.intern(date.date().isoformat()),
+        author_name=sys.intern(author['name']),
+        author_email=sys.intern(author['email']),
+        # Truncate once per commit rather than per branch it's listed under; the full text isn't kept
+        message=truncate_message(commit.get('comment', '')),
+        branches=None,
+        repository=repo_name
+    )
+
+def resolve_fetch_window(days_back, start_date=None, end_date=None):
+    """Return the (start, end) datetimes to fetch, filling in whichever bound wasn't given"""
+    # FIXED: Calculate date range correctly
+    if start_date and end_date:
+        # Use custom date range - these should already be datetime objects
+        return start_date, end_date
+    elif start_date:
+        # Use start_date and calculate end_date
+        return start_date, datetime.now()
+    elif end_date:
+        # Use end_date and calculate start_date
+        return end_date - timedelta(days=days_back), end_date
+    else:
+        # Use days_back from current date
+        fetch_end_date = datetime.now()
+        return fetch_end_date - timedelta(days=days_back), fetch_end_date
+
+def report_branches(branches):
+    """Pick the branches a commit is listed under: common branches first, at most MAX_BRANCHES_PER_COMMIT"""
+    if len(branches) <= MAX_BRANCHES_PER_COMMIT:
+        return branches
+    # sorted() is stable, so other branches keep the order the branch listing gave them
+    ranked = sorted(branches, key=lambda branch: COMMON_BRANCH_RANK.get(branch, len(COMMON_BRANCHES)))
+    return ranked[:MAX_BRANCHES_PER_COMMIT]
+
+def wrap_text(text, font_name, font_size, max_width):
+    """Wrap text to max_width like simpleSplit, also breaking words too wide to fit a line on their own"""
+    lines = []
+    for line in simpleSplit(text, font_name, font_size, max_width):
+        # simpleSplit leaves an over-long word (a URL, a path) whole on its own line
+        while len(line) > 1 and stringWidth(line, font_name, font_size) > max_width:
+            width = 0
+            for cut, char in enumerate(line):
+                width += stringWidth(char, font_name, font_size)
+                if width > max_width:
+                    break
+            # Keep at least one character per line so the loop always advances
+            cut = max(cut, 1)
+            lines.append(line[:cut])
+            line = line[cut:]
+        lines.append(line)
+    return lines
+
+def parse_json(response):
+    """Decode a JSON response body, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    # json.loads detects UTF-8/16/32 from the raw bytes, skipping requests' text decoding
+    return json.loads(response.content)
 
 class AzureDevOpsCommitsFetcher:
-    def __init__(self):
+    def __init__(self, cache_file=BRANCH_CACHE_FILE):
         self.session = requests.Session()
-        self.commits_data = []
-    
-    def setup_auth(self, token):
-        """Setup authentication for Azure DevOps API"""
-        # Azure DevOps uses PAT (Personal Access Token) in Basic Auth format
-        auth_string = f":{token}"
-        encoded_auth = base64.b64encode(auth_string.encode()).decode()
+        # Keep connections alive across the many requests to dev.azure.com and retry
+        # dropped connections; throttled responses are retried in request_with_backoff, so
+        # urllib3 must not also retry on status or Retry-After (it would sleep holding a slot)
+        adapter = HTTPAdapter(
+            pool_connections=MAX_CONCURRENT_REQUESTS,
+            pool_maxsize=MAX_CONCURRENT_REQUESTS,
+            max_retries=Retry(total=3, backoff_factor=0.5, status=0, respect_retry_after_header=False)
+        )
+        self.session.mount('https://', adapter)
         self.session.headers.update({
-            'Authorization': f'Basic {encoded_auth}',
+            'Accept-Encoding': 'gzip, deflate',
             'Content-Type': 'application/json'
         })
+        # Authorization headers per token; passed with each request so concurrent
+        # fetches with different tokens never touch shared session state
+        self.auth_headers = {}
+        # Repository and branch workers are nested pools, so bound their combined requests
+        # here; this keeps every request on a pooled connection and eases throttling
+        self.request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+        # When Azure DevOps asks a client to back off, every worker waits until this time
+        self.throttled_until = 0.0
+        self.commits_data = []
+        
+        # In-memory results of branch requests for this run, so a repository listed more than
+        # once in the config (e.g. under several tokens) is only looked up once
+        self.branch_tips = {}
+        self.branch_commit_ids = {}
+        
+        # The cache file is read here and written in close(), so it's only used on the thread
+        # that owns the fetcher; some dbm backends (sqlite3 from Python 3.13) refuse other threads.
+        # Repository workers read the loaded entries and queue new ones in memory
+        self.cache_file = cache_file
+        self.branch_cache = None
+        self.new_branch_cache_entries = {}
+        self.branch_cache_lock = threading.Lock()
+        if cache_file:
+            try:
+                with shelve.open(cache_file) as cache:
+                    self.branch_cache = dict(cache)
+            except Exception as e:
+                print(f"Warning: Could not open branch cache {cache_file}: {e}")
+    
+    def close(self):
+        """Close pooled connections and write newly resolved branches to the on-disk cache"""
+        self.session.close()
+        with self.branch_cache_lock:
+            new_entries, self.new_branch_cache_entries = self.new_branch_cache_entries, {}
+        if new_entries and self.branch_cache is not None:
+            try:
+                with shelve.open(self.cache_file) as cache:
+                    cache.update(new_entries)
+            except Exception as e:
+                print(f"Warning: Could not write branch cache {self.cache_file}: {e}")
+    
+    def get_cached_branches(self, cache_key):
+        """Return cached branches for a commit, or None if not cached or expired"""
+        if self.branch_cache is None:
+            return None
+        entry = self.branch_cache.get(cache_key)
+        
+        if entry is None:
+            return None
+        
+        branches, cached_at = entry
+        if branches == ['unknown'] and time.time() - cached_at > UNKNOWN_BRANCH_TTL:
+            return None
+        # Each cache entry unpickles its own copies of the branch names; share one per name
+        return [sys.intern(branch) for branch in branches]
+    
+    def cache_branches(self, cache_key, branches):
+        """Queue resolved branches for a commit to be written to the on-disk cache on close"""
+        if self.branch_cache is None:
+            return
+        with self.branch_cache_lock:
+            self.new_branch_cache_entries[cache_key] = (branches, time.time())
+    
+    def setup_auth(self, token):
+        """Return the request headers that authenticate with the given token"""
+        headers = self.auth_headers.get(token)
+        if headers is None:
+            # Azure DevOps uses PAT (Personal Access Token) in Basic Auth format
+            auth_string = f":{token}"
+            encoded_auth = base64.b64encode(auth_string.encode()).decode()
+            headers = self.auth_headers[token] = {'Authorization': f'Basic {encoded_auth}'}
+        return headers
+    
+    def request_with_backoff(self, url, params, headers, timeout=DEFAULT_TIMEOUT):
+        """GET a URL, backing off with jitter while Azure DevOps throttles (429) or fails with a 5xx"""
+        for attempt in range(MAX_REQUEST_ATTEMPTS):
+            # Requests share one rate limit, so don't send more while another worker is backing off
+            wait = self.throttled_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            
+            with self.request_slots:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+            
+            # Azure DevOps may send Retry-After (in seconds) even on successful responses once a
+            # client nears its limit; hold back all workers for that long
+            try:
+                retry_after = float(response.headers['Retry-After'])
+            except (KeyError, ValueError):
+                retry_after = None
+            if retry_after is not None:
+                self.throttled_until = max(self.throttled_until, time.monotonic() + retry_after)
+            
+            if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_REQUEST_ATTEMPTS - 1:
+                return response
+            
+            # Honor Retry-After when the server sends it, otherwise back off exponentially
+            delay = retry_after if retry_after is not None else 2 ** attempt
+            time.sleep(delay + random.uniform(0, 0.5))
+    
+    def iter_commit_pages(self, api_url, params, headers):
+        """Yield the raw commit objects of a commits listing one page at a time, following $skip"""
+        page_params = dict(params)
+        page_params['$top'] = COMMITS_PAGE_SIZE
+        skip = 0
+        while True:
+            page_params['$skip'] = skip
+            response = self.request_with_backoff(api_url, page_params, headers)
+            response.raise_for_status()
+            page = parse_json(response).get('value', [])
+            # Release the raw body before the caller projects the page, so only the parsed copy is held
+            del response
+            if page:
+                yield page
+            if len(page) < COMMITS_PAGE_SIZE:
+                return
+            skip += len(page)
     
     def parse_repo_url(self, repo_url):
         """Parse Azure DevOps repository URL to extract organization, project, and repo name"""
-        # Expected format: https://dev.azure.com/{organization}/{project}/_git/{repository}
-        # or: https://{organization}.visualstudio.com/{project}/_git/{repository}
-        
-        if 'dev.azure.com' in repo_url:
-            parts = repo_url.replace('https://dev.azure.com/', '').split('/')
-            organization = parts[0]
-            project = parts[1]
-            repo_name = parts[3] if len(parts) > 3 else parts[2].replace('_git/', '')
-        elif 'visualstudio.com' in repo_url:
-            parts = repo_url.replace('https://', '').split('/')
-            organization = parts[0].replace('.visualstudio.com', '')
-            project = parts[1]
-            repo_name = parts[3] if len(parts) > 3 else parts[2].replace('_git/', '')
-        else:
+        match = REPO_URL_PATTERN.match(repo_url.strip())
+        if not match:
             raise ValueError(f"Unsupported repository URL format: {repo_url}")
         
-        return organization, project, repo_name
+        # The repository name is stored on every commit and is part of every group key
+        return match['org'] or match['legacy_org'], match['project'] or match['repo'], sys.intern(match['repo'])
     
     def fetch_commits(self, repo_url, token, days_back=30, skip_branches=False, author_filter=None, start_date=None, end_date=None):
         """Fetch commits from a repository"""
         try:
-            self.setup_auth(token)
+            auth_headers = self.setup_auth(token)
             organization, project, repo_name = self.parse_repo_url(repo_url)
             
-            # FIXED: Calculate date range correctly
-            if start_date and end_date:
-                # Use custom date range - these should already be datetime objects
-                fetch_start_date = start_date
-                fetch_end_date = end_date
-            elif start_date:
-                # Use start_date and calculate end_date
-                fetch_start_date = start_date
-                fetch_end_date = datetime.now()
-            elif end_date:
-                # Use end_date and calculate start_date
-                fetch_end_date = end_date
-                fetch_start_date = end_date - timedelta(days=days_back)
-            else:
-                # Use days_back from current date
-                fetch_end_date = datetime.now()
-                fetch_start_date = fetch_end_date - timedelta(days=days_back)
+            fetch_start_date, fetch_end_date = resolve_fetch_window(days_back, start_date, end_date)
             
             # Azure DevOps REST API endpoint for commits
             api_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_name}/commits"
@@ -85,7 +348,10 @@ class AzureDevOpsCommitsFetcher:
                 'searchCriteria.fromDate': fetch_start_date.isoformat(),
                 'searchCriteria.toDate': fetch_end_date.isoformat(),
                 'api-version': '7.0',
-                '$top': 1000  # Maximum commits to fetch
+                # Leave out links, push data and work items, which the report never reads
+                'searchCriteria.includeLinks': 'false',
+                'searchCriteria.includePushData': 'false',
+                'searchCriteria.includeWorkItems': 'false'
             }
             
             # Add author filter if provided
@@ -93,38 +359,49 @@ class AzureDevOpsCommitsFetcher:
                 params['searchCriteria.author'] = author_filter
             
             print(f"Fetching commits from {repo_name} (from {fetch_start_date.strftime('%Y-%m-%d')} to {fetch_end_date.strftime('%Y-%m-%d')})...")
-            response = self.session.get(api_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            commits = data.get('value', [])
+            # Keep only the fields the report uses, so each page's payload can be freed
+            commits = [
+                commit_from_api(commit, repo_name)
+                for page in self.iter_commit_pages(api_url, params, auth_headers)
+                for commit in page
+            ]
             
-            # Additional client-side filtering if author_filter is provided
+            # The server already filters by author; this only guards against looser server-side
+            # matching, as a case-insensitive substring match on email or name
             if author_filter:
-                filtered_commits = []
-                for commit in commits:
-                    author_email = commit.get('author', {}).get('email', '').lower()
-                    author_name = commit.get('author', {}).get('name', '').lower()
-                    author_filter_lower = author_filter.lower()
-                    
-                    # Match by email or name
-                    if (author_filter_lower in author_email or 
-                        author_filter_lower in author_name or
-                        author_email == author_filter_lower or
-                        author_name == author_filter_lower):
-                        filtered_commits.append(commit)
-                commits = filtered_commits
+                needle = author_filter.lower()
+                commits = [
+                    commit for commit in commits
+                    if needle in commit.author_email.lower() or needle in commit.author_name.lower()
+                ]
             
             # Get branches for each commit
-            for commit in commits:
-                commit['repository'] = repo_name
-                commit['organization'] = organization
-                commit['project'] = project
-                # Fetch branch information for each commit
-                if skip_branches:
-                    commit['branches'] = ['main']  # Default branch when skipping detection
-                else:
-                    commit['branches'] = self.get_commit_branches(organization, project, repo_name, commit['commitId'])
+            branches_by_id = {}
+            if skip_branches:
+                for commit in commits:
+                    branches_by_id[commit.id] = ['main']  # Default branch when skipping detection
+            elif commits:
+                # Commits resolved on a previous run come from the cache; only new ones need the network
+                cache_prefix = f"{organization}/{project}/{repo_name}:"
+                uncached_ids = []
+                for commit in commits:
+                    branches = self.get_cached_branches(cache_prefix + commit.id)
+                    if branches is None:
+                        uncached_ids.append(commit.id)
+                    else:
+                        branches_by_id[commit.id] = branches
+                
+                if uncached_ids:
+                    # One request per branch instead of several per commit
+                    branch_index, complete = self.build_branch_index(auth_headers, organization, project, repo_name, params, fetch_start_date)
+                    for commit_id in uncached_ids:
+                        branches_by_id[commit_id] = branch_index.get(commit_id, ['unknown'])
+                        # A failed listing leaves lists short of some branches; don't keep those
+                        if complete:
+                            self.cache_branches(cache_prefix + commit_id, branches_by_id[commit_id])
+            
+            # The cache keeps every branch found; only the report is bounded
+            commits = [commit._replace(branches=report_branches(branches_by_id[commit.id])) for commit in commits]
             
             print(f"Found {len(commits)} commits in {repo_name}")
             return commits
@@ -136,94 +413,151 @@ class AzureDevOpsCommitsFetcher:
             print(f"Error processing repository {repo_url}: {e}")
             return []
     
-    def get_commit_branches(self, organization, project, repo_name, commit_id):
-        """Get branches that contain a specific commit"""
-        try:
-            # Method 1: Get all branches and check which ones contain this commit
-            api_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_name}/refs"
-            params = {
-                'api-version': '7.0',
-                'filter': 'heads/'
-            }
-            
-            response = self.session.get(api_url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                branches_found = []
-                
-                # Get up to 5 most common branches to check
-                common_branches = ['main', 'master', 'develop', 'dev', 'feature']
-                all_branches = []
-                
-                for ref in data.get('value', []):
-                    if ref['name'].startswith('refs/heads/'):
-                        branch_name = ref['name'].replace('refs/heads/', '')
-                        all_branches.append(branch_name)
-                
-                # Check common branches first, then others
-                branches_to_check = []
-                for branch in common_branches:
-                    if branch in all_branches:
-                        branches_to_check.append(branch)
-                
-                # Add a few other branches if we don't have enough
-                for branch in all_branches[:3]:
-                    if branch not in branches_to_check:
-                        branches_to_check.append(branch)
-                
-                # Check if commit exists in each branch
-                for branch_name in branches_to_check:
-                    try:
-                        commit_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_name}/commits/{commit_id}"
-                        params = {
-                            'api-version': '7.0',
-                            'searchCriteria.itemVersion.version': branch_name,
-                            'searchCriteria.itemVersion.versionType': 'branch'
-                        }
-                        
-                        branch_response = self.session.get(commit_url, params=params, timeout=5)
-                        if branch_response.status_code == 200:
-                            branches_found.append(branch_name)
-                        
-                        # Only check first few branches to avoid too many API calls
-                        if len(branches_found) >= 2:
-                            break
-                            
-                    except:
-                        continue
+    def build_branch_index(self, auth_headers, organization, project, repo_name, params, since):
+        """Map commit IDs to the branches that contain them, with one request per active branch.
+        
+        Returns the index and whether every listing succeeded.
+        """
+        repo_key = (organization, project, repo_name)
+        branch_tips = self.branch_tips.get(repo_key)
+        if branch_tips is None:
+            try:
+                # Branch stats include each branch's tip commit, which lets stale branches be skipped below
+                api_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_name}/stats/branches"
+                response = self.request_with_backoff(api_url, {'api-version': '7.0'}, auth_headers, timeout=10)
+                response.raise_for_status()
                 
-                if branches_found:
-                    return branches_found
+                branch_tips = [
+                    (
+                        sys.intern(branch['name']),
+                        branch['commit']['commitId'],
+                        parse_api_date(branch['commit']['committer']['date']).astimezone().replace(tzinfo=None)
+                    )
+                    for branch in parse_json(response).get('value', [])
+                ]
+            except Exception as e:
+                print(f"Warning: Could not list branches for {repo_name}: {e}")
+                return {}, False
+            self.branch_tips[repo_key] = branch_tips
+        
+        # Branches at the same tip share their whole history (common for freshly cut release
+        # or feature branches), so each distinct tip is listed only once
+        branches_by_tip = {}
+        for name, tip_commit_id, tip_date in branch_tips:
+            # A branch whose tip predates the window can't contain any commit in it
+            if tip_date >= since:
+                branches_by_tip.setdefault(tip_commit_id, []).append(name)
+        
+        if not branches_by_tip:
+            return {}, True
+        
+        # Branch listings are independent I/O, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=min(BRANCH_LOOKUP_WORKERS, len(branches_by_tip))) as executor:
+            commit_id_lists = executor.map(
+                lambda tip_commit_id: self.get_branch_commit_ids(auth_headers, organization, project, repo_name, tip_commit_id, params),
+                branches_by_tip
+            )
             
-            # Fallback: return the most likely branch names
-            return ['main/master']
+            # Invert branch -> commits into commit -> branches
+            branch_index = defaultdict(list)
+            complete = True
+            for branch_names, commit_ids in zip(branches_by_tip.values(), commit_id_lists):
+                if commit_ids is None:
+                    complete = False
+                    continue
+                for commit_id in commit_ids:
+                    branch_index[commit_id].extend(branch_names)
+        
+        return branch_index, complete
+    
+    def get_branch_commit_ids(self, auth_headers, organization, project, repo_name, tip_commit_id, params):
+        """Get IDs of the commits reachable from a branch tip, using the same search criteria as the main fetch.
+        
+        Returns None if the listing failed.
+        """
+        cache_key = (organization, project, repo_name, tip_commit_id, tuple(sorted(params.items())))
+        commit_ids = self.branch_commit_ids.get(cache_key)
+        if commit_ids is not None:
+            return commit_ids
+        
+        try:
+            api_url = f"https://dev.azure.com/{organization}/{project}/_apis/git/repositories/{repo_name}/commits"
+            branch_params = dict(params)
+            branch_params['searchCriteria.itemVersion.version'] = tip_commit_id
+            branch_params['searchCriteria.itemVersion.versionType'] = 'commit'
             
+            commit_ids = [
+                commit['commitId']
+                for page in self.iter_commit_pages(api_url, branch_params, auth_headers)
+                for commit in page
+            ]
         except Exception as e:
-            print(f"Warning: Could not determine branch for commit {commit_id[:8]}: {e}")
-            return ['main/master']
+            print(f"Warning: Could not list commits reachable from {tip_commit_id[:8]} in {repo_name}: {e}")
+            return None
+        
+        self.branch_commit_ids[cache_key] = commit_ids
+        return commit_ids
     
     def organize_commits_by_date_and_repo(self, all_commits):
-        """Organize commits by date, then by repository and branch"""
-        organized = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        """Group commits into a flat dict keyed by (date, repository, branch), plus summary stats gathered in the same pass.
+        
+        Groups are ordered by date (most recent first), then repository and branch,
+        and each group's commits are most recent first, so the report can be emitted in dict order.
+        """
+        # Walk newest first so every group's list is built already in display order; sorting on the
+        # date key first keeps each date's commits together even if timestamps carry mixed offsets.
+        # Each repository's commits already arrive newest first, so this one sort only merges those runs
+        newest_first = sorted(all_commits, key=attrgetter('date_key', 'date'), reverse=True)
+        organized = {}
+        repos = set()
+        total = 0
         
-        for commit in all_commits:
-            commit_date = datetime.fromisoformat(commit['author']['date'].replace('Z', '+00:00'))
-            date_key = commit_date.strftime('%Y-%m-%d')
-            repo_name = commit['repository']
+        for commit in newest_first:
+            repo_name = commit.repository
+            repos.add(repo_name)
+            total += len(commit.branches)
             
             # Handle multiple branches
-            branches = commit.get('branches', ['unknown'])
-            for branch in branches:
-                organized[date_key][repo_name][branch].append(commit)
+            for branch in commit.branches:
+                organized.setdefault((commit.date_key, repo_name, branch), []).append(commit)
+        
+        # Keys were inserted date by date, newest first, so only repository and
+        # branch order within each date is left to sort
+        ordered = {}
+        for _, date_group_keys in groupby(organized, key=itemgetter(0)):
+            for key in sorted(date_group_keys):
+                ordered[key] = organized[key]
         
-        return organized
+        stats = {
+            'min_date': newest_first[-1].date_key if newest_first else None,
+            'max_date': newest_first[0].date_key if newest_first else None,
+            'repos': repos,
+            'total': total
+        }
+        return ordered, stats
     
-    def generate_pdf(self, organized_commits, output_filename='azure_devops_commits_report.pdf', author_filter=None, date_range=None):
+    def generate_pdf(self, organized_commits, stats, output_filename='azure_devops_commits_report.pdf', author_filter=None, date_range=None):
         """Generate PDF report from organized commits"""
-        doc = SimpleDocTemplate(output_filename, pagesize=A4)
+        doc = BaseDocTemplate(output_filename, pagesize=A4)
+        doc.addPageTemplates([
+            PageTemplate(id='Report', frames=[Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')])
+        ])
         styles = getSampleStyleSheet()
         story = []
         
+        # Lay flowables out as each date is finished instead of holding the whole
+        # report in memory; this is the loop BaseDocTemplate.build runs over its story
+        doc._startBuild()
+        doc.canv._doctemplate = doc
+        
+        def flush(keep=0):
+            """Lay out pending flowables onto pages so they can be released, leaving the last keep in the story"""
+            while len(story) > keep:
+                if isinstance(story[0], Future):
+                    story[0] = story[0].result()
+                doc.clean_hanging()
+                doc.handle_flowable(story)
+        
         # Custom styles
         title_style = ParagraphStyle(
             'CustomTitle',
@@ -266,27 +600,23 @@ class AzureDevOpsCommitsFetcher:
             leftIndent=60,
             spaceAfter=8
         )
+        # Frames pad their content by 6pt on each side by default
+        message_width = doc.width - 2 * 6 - commit_style.leftIndent
         
         # Title
         story.append(Paragraph("Azure DevOps Commits Report", title_style))
         story.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
         if author_filter:
-            story.append(Paragraph(f"Filtered by author: {author_filter}", styles['Normal']))
+            story.append(Paragraph(f"Filtered by author: {escape(author_filter)}", styles['Normal']))
         if date_range:
             story.append(Paragraph(f"Date range: {date_range}", styles['Normal']))
         story.append(Spacer(1, 20))
         
         # Summary
-        total_commits = sum(
-            len(commits) for date_commits in organized_commits.values()
-            for repo_commits in date_commits.values()
-            for commits in repo_commits.values()
-        )
-        
         summary_data = [
-            ['Total Commits', str(total_commits)],
-            ['Date Range', f"{min(organized_commits.keys())} to {max(organized_commits.keys())}" if organized_commits else "No commits"],
-            ['Repositories', str(len(set(repo for date_commits in organized_commits.values() for repo in date_commits.keys())))]
+            ['Total Commits', str(stats['total'])],
+            ['Date Range', f"{stats['min_date']} to {stats['max_date']}" if stats['total'] else "No commits"],
+            ['Repositories', str(len(stats['repos']))]
         ]
         
         summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
@@ -303,49 +633,172 @@ class AzureDevOpsCommitsFetcher:
         story.append(summary_table)
         story.append(Spacer(1, 30))
         
-        # Organize by date (most recent first)
-        sorted_dates = sorted(organized_commits.keys(), reverse=True)
+        # Parsing block markup is the one CPU-heavy step that needs no document state,
+        # so large reports spread it over worker processes
+        executor = None
+        if stats['total'] >= PARALLEL_MARKUP_MIN_COMMITS and (os.cpu_count() or 1) > 1:
+            executor = ProcessPoolExecutor()
         
-        for date in sorted_dates:
-            story.append(Paragraph(f"📅 {date}", date_style))
-            
-            repos = organized_commits[date]
-            for repo_name in sorted(repos.keys()):
-                story.append(Paragraph(f"📁 Repository: {repo_name}", repo_style))
+        try:
+            # Groups arrive in report order from organize_commits_by_date_and_repo
+            current_date = current_repo = None
+            for (date, repo_name, branch_name), commits in organized_commits.items():
+                new_date = date != current_date
+                new_repo = new_date or repo_name != current_repo
+                if new_repo and current_repo is not None:
+                    story.append(Spacer(1, 12))
+                if new_date:
+                    if current_date is not None:
+                        story.append(Spacer(1, 20))
+                        # With worker processes, leave the date just finished in the story so its
+                        # blocks are parsed while the dates before it are laid out
+                        flush(len(story) - date_start if executor is not None else 0)
+                    # A commit shows up under every branch that contains it, all within its own date
+                    commit_markup = {}
+                    date_start = len(story)
+                    story.append(Paragraph(f"📅 {date}", date_style))
+                if new_repo:
+                    story.append(Paragraph(f"📁 Repository: {escape(repo_name)}", repo_style))
+                current_date, current_repo = date, repo_name
                 
-                branches = repos[repo_name]
-                for branch_name in sorted(branches.keys()):
-                    commits = branches[branch_name]
-                    story.append(Paragraph(f"🌿 Branch: {branch_name} ({len(commits)} commits)", branch_style))
-                    
-                    # Sort commits by time (most recent first)
-                    sorted_commits = sorted(commits, 
-                                          key=lambda x: datetime.fromisoformat(x['author']['date'].replace('Z', '+00:00')), 
-                                          reverse=True)
-                    
-                    for commit in sorted_commits:
-                        commit_time = datetime.fromisoformat(commit['author']['date'].replace('Z', '+00:00'))
-                        time_str = commit_time.strftime('%H:%M:%S')
-                        
-                        # Truncate long commit messages
-                        message = commit['comment'].strip().replace('\n', ' ')[:100]
-                        if len(commit['comment'].strip()) > 100:
-                            message += "..."
-                        
-                        commit_text = f"""
-                        <b>{time_str}</b> - {message}<br/>
-                        <i>Author:</i> {commit['author']['name']} &lt;{commit['author']['email']}&gt;<br/>
-                        <i>Commit ID:</i> <font color="blue">{commit['commitId'][:8]}</font>
-                        """
-                        
-                        story.append(Paragraph(commit_text, commit_style))
+                # Git allows '<' and '&' in branch names, which Paragraph would read as markup
+                story.append(Paragraph(f"🌿 Branch: {escape(branch_name)} ({len(commits)} commits)", branch_style))
                 
-                story.append(Spacer(1, 12))
+                # One preformatted block per branch instead of a Paragraph per commit,
+                # so Platypus lays out a few large flowables rather than thousands of small ones
+                entries = []
+                for commit in commits:
+                    entry = commit_markup.get(commit.id)
+                    if entry is None:
+                        time_str = commit.date.strftime('%H:%M:%S')
+                        # Preformatted text never wraps, so wrap the message to the frame width up front;
+                        # escaping comes after wrapping so entities don't count towards the line width
+                        message_lines = wrap_text(f"{time_str} - {commit.message}", commit_style.fontName, commit_style.fontSize, message_width)
+                        message_lines[0] = message_lines[0][len(time_str):]
+                        entry = commit_markup[commit.id] = format_commit_markup({
+                            'time': time_str,
+                            'message': escape('\n'.join(message_lines)),
+                            'name': escape(commit.author_name),
+                            'email': escape(commit.author_email),
+                            'commit_id': commit.id[:8]
+                        })
+                    entries.append(entry)
+                
+                for start in range(0, len(entries), COMMIT_BLOCK_SIZE):
+                    markup = '\n'.join(entries[start:start + COMMIT_BLOCK_SIZE])
+                    if executor is None:
+                        story.append(XPreformatted(markup, commit_style))
+                    else:
+                        story.append(executor.submit(XPreformatted, markup, commit_style))
+            
+            # Build PDF
+            flush()
+        except BaseException:
+            # Don't leave workers parsing blocks for a report that won't be finished
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            raise
+        if executor is not None:
+            executor.shutdown()
+        del doc.canv._doctemplate
+        doc._endBuild()
+        print(f"PDF report generated: {output_filename}")
+    
+    def report_lines(self, organized_commits, stats, author_filter=None, date_range=None):
+        """Yield (kind, text) lines of the plain-text report; 'gap' lines carry a vertical space in points"""
+        yield 'title', "Azure DevOps Commits Report"
+        yield 'gap', 30
+        yield 'info', f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        if author_filter:
+            yield 'info', f"Filtered by author: {author_filter}"
+        if date_range:
+            yield 'info', f"Date range: {date_range}"
+        
+        # Summary
+        yield 'gap', 20
+        yield 'summary', f"Total Commits: {stats['total']}"
+        yield 'summary', f"Date Range: {stats['min_date']} to {stats['max_date']}" if stats['total'] else "Date Range: No commits"
+        yield 'summary', f"Repositories: {len(stats['repos'])}"
+        yield 'gap', 30
+        
+        # Groups arrive in report order from organize_commits_by_date_and_repo
+        current_date = current_repo = None
+        for (date, repo_name, branch_name), commits in organized_commits.items():
+            if date != current_date:
+                yield 'date', date
+                current_repo = None
+            if repo_name != current_repo:
+                yield 'repo', f"Repository: {repo_name}"
+            current_date, current_repo = date, repo_name
+            
+            yield 'branch', f"Branch: {branch_name} ({len(commits)} commits)"
+            
+            for commit in commits:
+                time_str = commit.date.strftime('%H:%M:%S')
+                yield 'commit', f"{time_str} - {commit.message}"
+                yield 'author', f"Author: {commit.author_name} <{commit.author_email}>"
+                yield 'commit_id', f"Commit ID: {commit.id[:8]}"
+    
+    def generate_pdf_fast(self, organized_commits, stats, output_filename='azure_devops_commits_report.pdf', author_filter=None, date_range=None):
+        """Generate PDF report by drawing text directly on a canvas, skipping Platypus layout"""
+        canvas = Canvas(output_filename, pagesize=A4)
+        page_width, page_height = A4
+        margin = inch
+        y = page_height - margin
+        
+        for kind, text in self.report_lines(organized_commits, stats, author_filter, date_range):
+            if kind == 'gap':
+                y -= text
+                continue
             
-            story.append(Spacer(1, 20))
+            font, size, indent, color, space_before = REPORT_LINE_STYLES[kind]
+            leading = size * 1.2
+            y -= space_before
+            # Wrap to the page width, starting a new page when the bottom margin is reached
+            for line in wrap_text(text, font, size, page_width - 2 * margin - indent) or ['']:
+                if y - leading < margin:
+                    canvas.showPage()
+                    y = page_height - margin
+                canvas.setFont(font, size)
+                canvas.setFillColor(color)
+                y -= leading
+                if kind == 'title':
+                    canvas.drawCentredString(page_width / 2, y, line)
+                else:
+                    canvas.drawString(margin + indent, y, line)
         
-        # Build PDF
-        doc.build(story)
+        canvas.save()
+        print(f"PDF report generated: {output_filename}")
+    
+    def generate_pdf_fpdf(self, organized_commits, stats, output_filename='azure_devops_commits_report.pdf', author_filter=None, date_range=None):
+        """Generate PDF report with fpdf2, which emits text cells directly without a layout engine"""
+        from fpdf import FPDF
+        
+        pdf = FPDF(unit='pt', format='A4')
+        pdf.set_margins(inch, inch)
+        pdf.set_auto_page_break(True, margin=inch)
+        pdf.add_page()
+        
+        for kind, text in self.report_lines(organized_commits, stats, author_filter, date_range):
+            if kind == 'gap':
+                pdf.ln(text)
+                continue
+            
+            font, size, indent, color, space_before = REPORT_LINE_STYLES[kind]
+            pdf.ln(space_before)
+            pdf.set_font('Helvetica', 'B' if font.endswith('-Bold') else '', size)
+            pdf.set_text_color(*(round(channel * 255) for channel in color.rgb()))
+            # The built-in PDF fonts only cover Latin-1
+            text = text.encode('latin-1', 'replace').decode('latin-1')
+            width = pdf.epw - indent
+            align = 'C' if kind == 'title' else 'L'
+            # The core fonts have the same metrics in ReportLab, so wrap with the shared helper and
+            # emit plain cells; fpdf's multi_cell line breaking costs more than the rest of the render
+            for line in wrap_text(text, font, size, width - 2 * pdf.c_margin) or ['']:
+                pdf.set_x(pdf.l_margin + indent)
+                pdf.cell(width, size * 1.2, line, align=align, new_x='LMARGIN', new_y='NEXT')
+        
+        pdf.output(output_filename)
         print(f"PDF report generated: {output_filename}")
 
 def main():
@@ -355,8 +808,11 @@ def main():
     parser.add_argument('--end-date', help='End date for commits (YYYY-MM-DD format, e.g., 2024-01-31)')
     parser.add_argument('--author', help='Filter commits by author email or name (e.g., your.email@company.com or "Your Name")')
     parser.add_argument('--no-branches', action='store_true', help='Skip branch detection for faster processing')
+    parser.add_argument('--no-cache', action='store_true', help=f'Ignore the on-disk branch cache ({BRANCH_CACHE_FILE}) and resolve all branches again')
     parser.add_argument('--days', type=int, default=30, help='Number of days back to fetch commits (default: 30, ignored if start-date is provided)')
     parser.add_argument('--output', default='azure_devops_commits_report.pdf', help='Output PDF filename')
+    parser.add_argument('--pretty', action='store_true', help='Use the styled Platypus layout (slower for large reports)')
+    parser.add_argument('--backend', choices=['reportlab', 'fpdf'], default='reportlab', help='PDF library to render with (fpdf requires fpdf2)')
     
     args = parser.parse_args()
     
@@ -432,27 +888,40 @@ def main():
         sys.exit(1)
     
     # Fetch commits
-    fetcher = AzureDevOpsCommitsFetcher()
+    fetcher = AzureDevOpsCommitsFetcher(cache_file=None if args.no_cache else BRANCH_CACHE_FILE)
     all_commits = []
+    # Resolve the window once so every repository asks for the same dates, which also lets
+    # branch listings be reused when a repository is listed more than once
+    fetch_start_date, fetch_end_date = resolve_fetch_window(args.days, start_date_obj, end_date_obj)
     
-    for repo_config in repos_config:
-        commits = fetcher.fetch_commits(
-            repo_config['url'], 
-            repo_config['token'], 
-            args.days, 
-            skip_branches=getattr(args, 'no_branches', False),
-            author_filter=args.author,
-            start_date=start_date_obj,
-            end_date=end_date_obj
-        )
-        all_commits.extend(commits)
+    try:
+        # Repositories are independent, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(REPO_FETCH_WORKERS, len(repos_config)))) as executor:
+            futures = [
+                executor.submit(
+                    fetcher.fetch_commits,
+                    repo_config['url'], 
+                    repo_config['token'], 
+                    args.days, 
+                    skip_branches=getattr(args, 'no_branches', False),
+                    author_filter=args.author,
+                    start_date=fetch_start_date,
+                    end_date=fetch_end_date
+                )
+                for repo_config in repos_config
+            ]
+            for future in as_completed(futures):
+                all_commits.extend(future.result())
+    finally:
+        fetcher.close()
     
     if not all_commits:
         print("No commits found in the specified repositories and time range.")
         sys.exit(1)
     
-    # Organize and generate PDF
-    organized_commits = fetcher.organize_commits_by_date_and_repo(all_commits)
+    # Organize and generate PDF; this waits for every repository, since any of them can add
+    # commits to the newest date, which opens the report
+    organized_commits, stats = fetcher.organize_commits_by_date_and_repo(all_commits)
     
     # Create date range string for PDF
     date_range_str = None
@@ -464,7 +933,16 @@ def main():
         elif end_date_obj:
             date_range_str = f"Last {args.days} days ending {end_date_obj.strftime('%Y-%m-%d')}"
     
-    fetcher.generate_pdf(organized_commits, args.output, author_filter=args.author, date_range=date_range_str)
+    if args.backend == 'fpdf':
+        try:
+            fetcher.generate_pdf_fpdf(organized_commits, stats, args.output, author_filter=args.author, date_range=date_range_str)
+        except ImportError:
+            print("The fpdf backend requires fpdf2. Install it with: pip install fpdf2")
+            sys.exit(1)
+    elif args.pretty:
+        fetcher.generate_pdf(organized_commits, stats, args.output, author_filter=args.author, date_range=date_range_str)
+    else:
+        fetcher.generate_pdf_fast(organized_commits, stats, args.output, author_filter=args.author, date_range=date_range_str)
     
     print(f"\nReport generated successfully!")
     print(f"Total commits processed: {len(all_commits)}")